@@ -4,23 +4,88 @@ Commute Tracker - A smart commute tracking application
 Monitors commute times and suggests optimal departure times
 """
 
+import calendar
 import os
+import re
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 from typing import List, Dict, Optional
 import sqlite3
 import time
 import schedule
 import googlemaps
-from collections import defaultdict
+import requests
+from requests.adapters import HTTPAdapter
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
 load_dotenv()
 
+# Distance Matrix requests are limited to 25 origins, 25 destinations and
+# 100 elements; 10x10 chunks stay within all three limits
+MATRIX_CHUNK_SIZE = 10
+
+# Cap on concurrent Distance Matrix requests during a poll cycle
+POLL_MAX_WORKERS = 8
+
+# How long a polled route stays fresh; routes re-polled within the same
+# 15-minute bucket inside this window are skipped entirely
+ROUTE_CACHE_TTL_SECONDS = 900
+
+# Matches a 24-hour HH:MM time, e.g. "09:00" or "17:30"
+_TIME_RE = re.compile(r'^([01]?\d|2[0-3]):([0-5]?\d)$')
+
+# A route counts as stable at a (weekday, hour) bucket - and its poll is
+# skipped - when this many recent samples spread less than the given
+# fraction of their mean; stale buckets are re-polled after the max age
+STABLE_MIN_SAMPLES = 5
+STABLE_RANGE_FRACTION = 0.10
+STABLE_MAX_AGE_DAYS = 30
+
+
+def _chunks(items: List, size: int) -> List[List]:
+    """Split a list into consecutive chunks of at most `size` items"""
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
 
 class CommuteTracker:
     """Main class for tracking commute times and providing recommendations"""
-    
+
+    # Hot-path SQL kept as stable constants so sqlite3's LRU statement
+    # cache (cached_statements below) reuses the prepared plans
+    _SQL_LIST_ADDRESSES = 'SELECT id, label, address, type FROM addresses'
+    _SQL_LIST_ADDRESSES_BY_TYPE = _SQL_LIST_ADDRESSES + ' WHERE type = ?'
+    _SQL_GET_ADDRESS = 'SELECT address FROM addresses WHERE id = ?'
+    _SQL_ROUTE_STABILITY = '''
+        SELECT COUNT(*) as sample_count,
+               AVG(d) as mean_duration,
+               MAX(d) - MIN(d) as duration_range,
+               julianday('now') - julianday(MAX(ts), 'unixepoch') as newest_age_days
+        FROM (
+            SELECT duration_in_traffic_seconds as d, timestamp as ts
+            FROM commute_logs
+            WHERE origin_id = ? AND destination_id = ?
+              AND day_of_week = ? AND hour = ?
+            ORDER BY id DESC
+            LIMIT 10
+        )
+    '''
+    _SQL_INSERT_LOG = '''
+        INSERT INTO commute_logs
+        (origin_id, destination_id, duration_seconds,
+         duration_in_traffic_seconds, distance_meters, timestamp)
+        VALUES (?, ?, ?, ?, ?, ?)
+    '''
+    _SQL_UPSERT_ROLLUP = '''
+        INSERT INTO commute_rollup
+        (origin_id, destination_id, day_of_week, hour, sum_duration, sum_sq, count)
+        VALUES (?, ?, ?, ?, ?, ?, 1)
+        ON CONFLICT(origin_id, destination_id, day_of_week, hour)
+        DO UPDATE SET sum_duration = sum_duration + excluded.sum_duration,
+                      sum_sq = sum_sq + excluded.sum_sq,
+                      count = count + excluded.count
+    '''
+
     def __init__(self, db_path: str = "commute_data.db", api_key: Optional[str] = None):
         """
         Initialize the Commute Tracker
@@ -34,15 +99,36 @@ class CommuteTracker:
         self.gmaps = None
         
         if self.api_key:
-            self.gmaps = googlemaps.Client(key=self.api_key)
-        
+            # A pooled session keeps TCP/TLS connections to the Maps API
+            # alive across requests instead of re-handshaking per call
+            session = requests.Session()
+            session.mount('https://', HTTPAdapter(pool_connections=16,
+                                                  pool_maxsize=16))
+            self.gmaps = googlemaps.Client(key=self.api_key,
+                                           requests_session=session)
+
+        # Maps (origin_id, destination_id, time_bucket) -> poll timestamp,
+        # so repeat polls within ROUTE_CACHE_TTL_SECONDS skip the API
+        self._route_cache: Dict[tuple, float] = {}
+
         self._init_database()
     
     def _init_database(self):
-        """Initialize SQLite database with required tables"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
+        """Open the per-instance SQLite connection and create required tables"""
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False,
+                                     cached_statements=256)
+        self._conn.row_factory = sqlite3.Row
+        cursor = self._conn.cursor()
+
+        # Performance settings: WAL avoids writer-blocks-reader stalls and
+        # makes commits cheaper, NORMAL sync is safe with WAL, and the
+        # larger mmap window / page cache speed up the analytic queries
+        cursor.execute('PRAGMA journal_mode=WAL')
+        cursor.execute('PRAGMA synchronous=NORMAL')
+        cursor.execute('PRAGMA temp_store=MEMORY')
+        cursor.execute('PRAGMA mmap_size=268435456')  # 256 MB
+        cursor.execute('PRAGMA cache_size=-65536')    # 64 MB
+
         # Table for storing addresses
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS addresses (
@@ -54,7 +140,20 @@ class CommuteTracker:
             )
         ''')
         
-        # Table for storing commute logs
+        # Databases from before the epoch-timestamp schema carry a TEXT
+        # timestamp plus materialized day_of_week/hour columns; rebuild
+        # them into the generated-column layout below
+        cursor.execute("SELECT type FROM pragma_table_info('commute_logs') "
+                       "WHERE name = 'timestamp'")
+        row = cursor.fetchone()
+        legacy_logs = row is not None and row['type'] != 'INTEGER'
+        if legacy_logs:
+            cursor.execute('ALTER TABLE commute_logs RENAME TO commute_logs_legacy')
+
+        # Table for storing commute logs. timestamp holds local-time epoch
+        # seconds (the 'localtime' modifier is non-deterministic and thus
+        # barred from generated columns), so day_of_week (Monday=0,
+        # matching datetime.weekday) and hour decode with plain 'unixepoch'
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS commute_logs (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -63,17 +162,90 @@ class CommuteTracker:
                 duration_seconds INTEGER NOT NULL,
                 duration_in_traffic_seconds INTEGER,
                 distance_meters INTEGER NOT NULL,
-                timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                day_of_week INTEGER NOT NULL,
-                hour INTEGER NOT NULL,
+                timestamp INTEGER NOT NULL,
+                day_of_week INTEGER GENERATED ALWAYS AS (
+                    (CAST(strftime('%w', timestamp, 'unixepoch')
+                          AS INTEGER) + 6) % 7
+                ) STORED,
+                hour INTEGER GENERATED ALWAYS AS (
+                    CAST(strftime('%H', timestamp, 'unixepoch') AS INTEGER)
+                ) STORED,
                 FOREIGN KEY (origin_id) REFERENCES addresses(id),
                 FOREIGN KEY (destination_id) REFERENCES addresses(id)
             )
         ''')
-        
-        conn.commit()
-        conn.close()
-    
+
+        if legacy_logs:
+            cursor.execute('''
+                INSERT INTO commute_logs
+                (id, origin_id, destination_id, duration_seconds,
+                 duration_in_traffic_seconds, distance_meters, timestamp)
+                SELECT id, origin_id, destination_id, duration_seconds,
+                       duration_in_traffic_seconds, distance_meters,
+                       CAST(strftime('%s', timestamp, 'localtime') AS INTEGER)
+                FROM commute_logs_legacy
+            ''')
+            cursor.execute('DROP TABLE commute_logs_legacy')
+
+        # Covering index so the per-route aggregations in
+        # get_optimal_departure_times/get_statistics never scan the table
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_logs_route_time
+            ON commute_logs(origin_id, destination_id, day_of_week, hour,
+                            duration_in_traffic_seconds)
+        ''')
+
+        # Pre-aggregated rollup per (route, day, hour) bucket, maintained at
+        # insert time so recommendations never re-scan commute_logs; sum_sq
+        # keeps the running variance available alongside the mean
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS commute_rollup (
+                origin_id INTEGER NOT NULL,
+                destination_id INTEGER NOT NULL,
+                day_of_week INTEGER NOT NULL,
+                hour INTEGER NOT NULL,
+                sum_duration REAL NOT NULL DEFAULT 0,
+                sum_sq REAL NOT NULL DEFAULT 0,
+                count INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (origin_id, destination_id, day_of_week, hour)
+            )
+        ''')
+
+        # Databases created before sum_sq existed get the column added and
+        # their rollup rebuilt from the raw logs below
+        cursor.execute('PRAGMA table_info(commute_rollup)')
+        if 'sum_sq' not in [row['name'] for row in cursor.fetchall()]:
+            cursor.execute('ALTER TABLE commute_rollup '
+                           'ADD COLUMN sum_sq REAL NOT NULL DEFAULT 0')
+            cursor.execute('DELETE FROM commute_rollup')
+
+        # Backfill the rollup from any history logged before it existed
+        cursor.execute('SELECT COUNT(*) FROM commute_rollup')
+        if cursor.fetchone()[0] == 0:
+            cursor.execute('''
+                INSERT INTO commute_rollup
+                (origin_id, destination_id, day_of_week, hour,
+                 sum_duration, sum_sq, count)
+                SELECT origin_id, destination_id, day_of_week, hour,
+                       SUM(duration_in_traffic_seconds),
+                       SUM(duration_in_traffic_seconds * duration_in_traffic_seconds),
+                       COUNT(*)
+                FROM commute_logs
+                GROUP BY origin_id, destination_id, day_of_week, hour
+            ''')
+
+        self._conn.commit()
+
+    def close(self):
+        """Close the underlying database connection"""
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
     def add_address(self, label: str, address: str, addr_type: str) -> int:
         """
         Add a new address (home or work location)
@@ -88,53 +260,47 @@ class CommuteTracker:
         """
         if addr_type not in ['home', 'work']:
             raise ValueError("Address type must be 'home' or 'work'")
-        
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
+
+        cursor = self._conn.cursor()
+
         cursor.execute(
             'INSERT INTO addresses (label, address, type) VALUES (?, ?, ?)',
             (label, address, addr_type)
         )
-        
+
         address_id = cursor.lastrowid
-        conn.commit()
-        conn.close()
-        
+        self._conn.commit()
+
         return address_id
     
+    def _iter_addresses(self, addr_type: Optional[str] = None):
+        """
+        Yield address dictionaries lazily, optionally filtered by type
+
+        Callers that only iterate once avoid materializing the full list
+        """
+        cursor = self._conn.cursor()
+
+        if addr_type:
+            cursor.execute(self._SQL_LIST_ADDRESSES_BY_TYPE, (addr_type,))
+        else:
+            cursor.execute(self._SQL_LIST_ADDRESSES)
+
+        # sqlite3.Row exposes the columns directly; no per-row dict assembly
+        for row in cursor:
+            yield dict(row)
+
     def list_addresses(self, addr_type: Optional[str] = None) -> List[Dict]:
         """
         List all addresses or filter by type
-        
+
         Args:
             addr_type: Optional filter by "home" or "work"
-        
+
         Returns:
             List of address dictionaries
         """
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        if addr_type:
-            cursor.execute(
-                'SELECT id, label, address, type FROM addresses WHERE type = ?',
-                (addr_type,)
-            )
-        else:
-            cursor.execute('SELECT id, label, address, type FROM addresses')
-        
-        addresses = []
-        for row in cursor.fetchall():
-            addresses.append({
-                'id': row[0],
-                'label': row[1],
-                'address': row[2],
-                'type': row[3]
-            })
-        
-        conn.close()
-        return addresses
+        return list(self._iter_addresses(addr_type))
     
     def delete_address(self, address_id: int) -> bool:
         """
@@ -143,18 +309,15 @@ class CommuteTracker:
         Returns:
             True if address was deleted, False if it didn't exist
         """
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
+        cursor = self._conn.cursor()
+
         # Check if address exists
         cursor.execute('SELECT id FROM addresses WHERE id = ?', (address_id,))
         if not cursor.fetchone():
-            conn.close()
             return False
-        
+
         cursor.execute('DELETE FROM addresses WHERE id = ?', (address_id,))
-        conn.commit()
-        conn.close()
+        self._conn.commit()
         return True
     
     def poll_commute_times(self):
@@ -174,48 +337,129 @@ class CommuteTracker:
             return
         
         now = datetime.now()
-        
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # Poll commute times for all combinations
+        # Evaluated once per poll cycle rather than once per route
+        weekday, hour = now.weekday(), now.hour
+        # Local-time epoch, matching the commute_logs generated columns
+        timestamp = calendar.timegm(now.timetuple())
+
+        # Skip routes polled recently in the same time bucket - repeat polls
+        # within the TTL would just re-fetch near-identical traffic data
+        bucket = (weekday, hour, now.minute // 15)
+        self._route_cache = {
+            key: polled_at for key, polled_at in self._route_cache.items()
+            if time.time() - polled_at < ROUTE_CACHE_TTL_SECONDS
+        }
+        needed = {
+            (home['id'], work['id'])
+            for home in homes for work in workplaces
+            if (home['id'], work['id'], bucket) not in self._route_cache
+        }
+
+        # Routes whose recent history at this (weekday, hour) bucket is
+        # nearly flat are reported from that history without an API call;
+        # the age cap ensures drifting traffic still gets re-polled
+        cursor = self._conn.cursor()
         for home in homes:
             for work in workplaces:
+                if (home['id'], work['id']) not in needed:
+                    continue
+
+                cursor.execute(self._SQL_ROUTE_STABILITY,
+                               (home['id'], work['id'], weekday, hour))
+                stats = cursor.fetchone()
+                if (stats['sample_count'] >= STABLE_MIN_SAMPLES
+                        and stats['duration_range'] <
+                            STABLE_RANGE_FRACTION * stats['mean_duration']
+                        and stats['newest_age_days'] < STABLE_MAX_AGE_DAYS):
+                    needed.discard((home['id'], work['id']))
+                    print(f"Stable: {home['label']} → {work['label']}: "
+                          f"~{int(stats['mean_duration']) // 60} min (poll skipped)")
+
+        if not needed:
+            print("All routes cached or stable; nothing to poll.")
+            return
+
+        # Only query homes/workplaces that still have an uncached pair
+        homes = [h for h in homes
+                 if any((h['id'], w['id']) in needed for w in workplaces)]
+        workplaces = [w for w in workplaces
+                      if any((h['id'], w['id']) in needed for h in homes)]
+
+        # One Distance Matrix request covers a whole chunk of home x work
+        # pairs, collapsing N*M Directions round-trips into a handful; the
+        # chunk requests themselves run concurrently since the googlemaps
+        # client (on its pooled session) is thread-safe
+        chunk_pairs = [
+            (home_chunk, work_chunk)
+            for home_chunk in _chunks(homes, MATRIX_CHUNK_SIZE)
+            for work_chunk in _chunks(workplaces, MATRIX_CHUNK_SIZE)
+        ]
+
+        rows = []
+        with ThreadPoolExecutor(
+                max_workers=min(POLL_MAX_WORKERS, len(chunk_pairs))) as executor:
+            futures = {
+                executor.submit(
+                    self.gmaps.distance_matrix,
+                    origins=[h['address'] for h in home_chunk],
+                    destinations=[w['address'] for w in work_chunk],
+                    mode="driving",
+                    departure_time=now,
+                    traffic_model="best_guess"
+                ): (home_chunk, work_chunk)
+                for home_chunk, work_chunk in chunk_pairs
+            }
+
+            for future in as_completed(futures):
+                home_chunk, work_chunk = futures[future]
                 try:
-                    # Get directions with traffic
-                    result = self.gmaps.directions(
-                        home['address'],
-                        work['address'],
-                        mode="driving",
-                        departure_time=now
-                    )
-                    
-                    if result:
-                        leg = result[0]['legs'][0]
-                        duration = leg['duration']['value']  # seconds
-                        duration_in_traffic = leg.get('duration_in_traffic', {}).get('value', duration)
-                        distance = leg['distance']['value']  # meters
-                        
-                        # Store in database
-                        cursor.execute('''
-                            INSERT INTO commute_logs 
-                            (origin_id, destination_id, duration_seconds, 
-                             duration_in_traffic_seconds, distance_meters, 
-                             day_of_week, hour)
-                            VALUES (?, ?, ?, ?, ?, ?, ?)
-                        ''', (
+                    matrix = future.result()
+                except Exception as e:
+                    print(f"Error polling distance matrix: {e}")
+                    continue
+
+                for home, matrix_row in zip(home_chunk, matrix['rows']):
+                    for work, element in zip(work_chunk, matrix_row['elements']):
+                        if (home['id'], work['id']) not in needed:
+                            continue
+
+                        if element.get('status') != 'OK':
+                            print(f"Error polling {home['label']} → {work['label']}: "
+                                  f"{element.get('status')}")
+                            continue
+
+                        duration = element['duration']['value']  # seconds
+                        duration_in_traffic = element.get(
+                            'duration_in_traffic', {}).get('value', duration)
+                        distance = element['distance']['value']  # meters
+
+                        rows.append((
                             home['id'], work['id'], duration, duration_in_traffic,
-                            distance, now.weekday(), now.hour
+                            distance, timestamp
                         ))
-                        
+                        self._route_cache[(home['id'], work['id'], bucket)] = time.time()
+
                         print(f"Logged: {home['label']} → {work['label']}: "
                               f"{duration_in_traffic // 60} min")
-                
-                except Exception as e:
-                    print(f"Error polling {home['label']} → {work['label']}: {e}")
-        
-        conn.commit()
-        conn.close()
+
+        if not rows:
+            return
+
+        # One executemany inside an explicit transaction amortizes the
+        # per-statement parse/bind overhead across all routes
+        cursor = self._conn.cursor()
+        cursor.execute('BEGIN IMMEDIATE')
+        cursor.executemany(self._SQL_INSERT_LOG, rows)
+
+        # Fold the new samples into the per-bucket rollup so analytic
+        # queries stay O(1) regardless of history length
+        cursor.executemany(self._SQL_UPSERT_ROLLUP, [
+            (origin_id, destination_id, weekday, hour,
+             duration_in_traffic, duration_in_traffic * duration_in_traffic)
+            for (origin_id, destination_id, _duration, duration_in_traffic,
+                 _distance, _timestamp) in rows
+        ])
+        self._conn.commit()
     
     def get_current_commute_time(self, origin_id: int, destination_id: int) -> Optional[Dict]:
         """
@@ -227,16 +471,13 @@ class CommuteTracker:
         if not self.gmaps:
             return None
         
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('SELECT address FROM addresses WHERE id = ?', (origin_id,))
+        cursor = self._conn.cursor()
+
+        cursor.execute(self._SQL_GET_ADDRESS, (origin_id,))
         origin = cursor.fetchone()
-        cursor.execute('SELECT address FROM addresses WHERE id = ?', (destination_id,))
+        cursor.execute(self._SQL_GET_ADDRESS, (destination_id,))
         destination = cursor.fetchone()
-        
-        conn.close()
-        
+
         if not origin or not destination:
             return None
         
@@ -277,74 +518,58 @@ class CommuteTracker:
             ValueError: If target_arrival is not in HH:MM format
         """
         # Validate target_arrival format
-        try:
-            parts = target_arrival.split(':')
-            if len(parts) != 2:
-                raise ValueError
-            target_hour, target_minute = int(parts[0]), int(parts[1])
-            if not (0 <= target_hour <= 23 and 0 <= target_minute <= 59):
-                raise ValueError
-        except (ValueError, AttributeError):
+        match = _TIME_RE.match(target_arrival)
+        if not match:
             raise ValueError(f"Invalid time format '{target_arrival}'. Expected HH:MM (e.g., 09:00)")
+        target_hour, target_minute = int(match[1]), int(match[2])
         
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # Get historical data for this route
+        cursor = self._conn.cursor()
+
+        # Let SQL pick the cheapest hour per day directly - the bare `hour`
+        # and `sample_count` columns come from the MIN(avg_duration) row,
+        # so at most 7 rows ever reach Python
         cursor.execute('''
-            SELECT day_of_week, hour, 
-                   AVG(duration_in_traffic_seconds) as avg_duration,
-                   COUNT(*) as sample_count
-            FROM commute_logs
-            WHERE origin_id = ? AND destination_id = ?
-            GROUP BY day_of_week, hour
-            HAVING sample_count >= 3
-            ORDER BY day_of_week, hour
+            WITH agg AS (
+                SELECT day_of_week, hour,
+                       sum_duration / count as avg_duration,
+                       count as sample_count
+                FROM commute_rollup
+                WHERE origin_id = ? AND destination_id = ?
+                  AND count >= 3
+            )
+            SELECT day_of_week, hour, MIN(avg_duration) as avg_duration, sample_count
+            FROM agg
+            GROUP BY day_of_week
+            ORDER BY day_of_week
         ''', (origin_id, destination_id))
-        
+
         data = cursor.fetchall()
-        conn.close()
-        
+
         if not data:
             return []
         target_minutes = target_hour * 60 + target_minute
-        
-        # Organize by day of week
-        by_day = defaultdict(list)
-        for row in data:
-            day, hour, avg_duration, count = row
-            by_day[day].append({
-                'hour': hour,
-                'avg_duration_minutes': avg_duration / 60,
-                'sample_count': count
-            })
-        
-        # Find optimal departure times for each day
+
         recommendations = []
         day_names = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
-        
-        for day in range(7):
-            if day not in by_day:
-                continue
-            
-            # Find the hour with minimum average duration
-            best_hour = min(by_day[day], key=lambda x: x['avg_duration_minutes'])
-            
+
+        for day, hour, avg_duration, sample_count in data:
+            avg_duration_minutes = avg_duration / 60
+
             # Calculate suggested departure time
-            departure_minutes = target_minutes - int(best_hour['avg_duration_minutes'])
+            departure_minutes = target_minutes - int(avg_duration_minutes)
             if departure_minutes < 0:
                 departure_minutes += 24 * 60
-            
+
             departure_hour = departure_minutes // 60
             departure_min = departure_minutes % 60
-            
+
             recommendations.append({
                 'day': day_names[day],
                 'optimal_departure': f"{departure_hour:02d}:{departure_min:02d}",
-                'expected_duration_minutes': int(best_hour['avg_duration_minutes']),
-                'data_points': best_hour['sample_count']
+                'expected_duration_minutes': int(avg_duration_minutes),
+                'data_points': sample_count
             })
-        
+
         return recommendations
     
     def get_statistics(self, origin_id: int, destination_id: int) -> Dict:
@@ -354,11 +579,10 @@ class CommuteTracker:
         Returns:
             Dictionary with min, max, avg commute times
         """
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
+        cursor = self._conn.cursor()
+
         cursor.execute('''
-            SELECT 
+            SELECT
                 MIN(duration_in_traffic_seconds) / 60 as min_minutes,
                 MAX(duration_in_traffic_seconds) / 60 as max_minutes,
                 AVG(duration_in_traffic_seconds) / 60 as avg_minutes,
@@ -366,10 +590,9 @@ class CommuteTracker:
             FROM commute_logs
             WHERE origin_id = ? AND destination_id = ?
         ''', (origin_id, destination_id))
-        
+
         row = cursor.fetchone()
-        conn.close()
-        
+
         if row and row[3] > 0:
             return {
                 'min_minutes': int(row[0]),
@@ -470,9 +693,15 @@ def main():
         tracker.poll_commute_times()
         
         try:
+            # Sleep exactly until the next scheduled poll instead of waking
+            # every minute to check
             while True:
+                idle = schedule.idle_seconds()
+                if idle is None:
+                    break
+                if idle > 0:
+                    time.sleep(idle)
                 schedule.run_pending()
-                time.sleep(60)
         except KeyboardInterrupt:
             print("\nMonitoring stopped")
     